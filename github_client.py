@@ -1,36 +1,281 @@
-import requests
-import zipfile
+import asyncio
 import io
+import logging
+import queue
+import httpx
+import tarfile
 import os
 import shutil
+import subprocess
+import threading
+from pathlib import Path
 
-def download_repo_zip(repo_full_name: str, commit_sha: str, token: str, dest_dir: str):
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+# 다운로드 → 압축 해제 스레드 사이에 대기시킬 최대 청크 수 (메모리 상한 = 이 값 x CHUNK_SIZE)
+PIPE_MAX_CHUNKS = 8
+# 기존 파일과 내용 비교를 위해 메모리에 읽어 둘 최대 파일 크기 (초과 시 비교 없이 덮어씀)
+COMPARE_MAX_SIZE = 64 * 1024 * 1024
+
+# 압축 해제 완료 표시 파일 (커밋 SHA 기록 - 커밋 tarball은 바뀌지 않으므로 SHA가 같으면 재사용)
+SHA_MARKER = ".sha"
+
+
+def _read_marker(dest_dir: str, name: str):
+    try:
+        with open(os.path.join(dest_dir, name), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def is_repo_cached(dest_dir: str, commit_sha: str) -> bool:
+    """dest_dir에 해당 커밋이 이미 온전히 압축 해제되어 있는지 확인"""
+    return _read_marker(dest_dir, SHA_MARKER) == commit_sha
+
+
+def remove_repo_dir(dest_dir: str):
+    """압축 해제된 레포 디렉토리 삭제 (작업 디렉토리 캐시에서 제외할 때 사용)"""
+    if os.path.isdir(dest_dir):
+        _fast_rmtree(dest_dir)
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """웹훅 간에 TCP/TLS 세션을 재사용하는 공유 HTTP/2 클라이언트 생성"""
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=30.0,
+        # tarball 엔드포인트는 codeload.github.com 으로 302 리다이렉트됨
+        follow_redirects=True,
+    )
+
+
+class _ChunkPipe(io.RawIOBase):
+    """이벤트 루프가 넣은 응답 청크를 압축 해제 스레드가 파일처럼 읽는 파이프
+
+    루프 쪽은 스레드 풀을 거치지 않고 청크를 바로 넣으며, 대기 청크가 PIPE_MAX_CHUNKS개를
+    넘으면 읽는 쪽이 가져갈 때까지 (루프를 막지 않고) 기다림
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__()
+        self._loop = loop
+        self._chunks = queue.SimpleQueue()
+        # 남은 대기 슬롯 - 읽는 쪽이 청크를 하나 가져갈 때마다 루프에서 반환
+        self._slots = asyncio.Semaphore(PIPE_MAX_CHUNKS)
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self.reader_done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            self._loop.call_soon_threadsafe(self._slots.release)
+            if chunk is None:
+                self._eof = True
+                return 0
+            self._buffer = memoryview(chunk)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close_reader(self):
+        """(압축 해제 스레드) 읽기 종료 표시 - 슬롯을 기다리던 feed를 깨움"""
+        self.reader_done = True
+        self._loop.call_soon_threadsafe(self._slots.release)
+
+    async def feed(self, chunk) -> bool:
+        """(이벤트 루프) 청크 전달. 읽는 쪽이 먼저 끝났으면 False 반환"""
+        if self.reader_done:
+            return False
+        await self._slots.acquire()
+        if self.reader_done:
+            return False
+        self._chunks.put(chunk)
+        return True
+
+    def finish(self):
+        """(이벤트 루프) EOF 전달 - 슬롯을 기다리지 않으므로 예외/취소 처리 중에도 바로 반환"""
+        self._chunks.put(None)
+
+
+def _start_thread(fn, *args) -> asyncio.Future:
+    """기본 스레드 풀을 쓰지 않고 전용 스레드에서 fn 실행 (결과는 Future로 전달)
+
+    다운로드가 몰려도 풀 스레드가 고갈되어 서로를 기다리다 멈추는 일이 없도록 함
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def settle(result, exc):
+        if future.done():
+            return
+        if exc is not None:
+            future.set_exception(exc)
+        else:
+            future.set_result(result)
+
+    def run():
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            loop.call_soon_threadsafe(settle, None, e)
+        else:
+            loop.call_soon_threadsafe(settle, result, None)
+
+    threading.Thread(target=run, name="tar-extract", daemon=True).start()
+    return future
+
+
+def _safe_target(root: Path, name: str) -> Path:
+    """아카이브 엔트리 경로를 root 기준으로 해석 (root 밖을 가리키면 거부)"""
+    target = (root / name).resolve()
+    if not target.is_relative_to(root):
+        raise Exception(f"Unsafe path in archive: {name}")
+    return target
+
+
+def _fast_rmtree(path):
+    """디렉토리 트리 삭제 - POSIX에서는 rm -rf로 파이썬 재귀/파일별 syscall 오버헤드를 피함"""
+    if os.name == "posix":
+        subprocess.run(["rm", "-rf", "--", os.fspath(path)], check=True)
+    else:
+        shutil.rmtree(path)
+
+
+def _strip_root(name: str) -> str:
+    """tarball 최상위 폴더(owner-repo-<sha>/) 제거 - 커밋이 바뀌어도 경로가 유지되도록"""
+    return name.split("/", 1)[1] if "/" in name else ""
+
+
+def _sync_member(tar: tarfile.TarFile, member: tarfile.TarInfo, target: Path):
+    """기존 파일과 내용이 같으면 건너뛰고, 다르면 덮어씀"""
+    try:
+        st = target.stat()
+    except FileNotFoundError:
+        st = None
+    if st is not None and target.is_dir():
+        _fast_rmtree(target)
+        st = None
+
+    src = tar.extractfile(member)
+    # 스트리밍 모드에서는 되감기가 안 되므로, 비교할 때는 멤버 내용을 먼저 읽어 둠
+    if st is not None and st.st_size == member.size and member.size <= COMPARE_MAX_SIZE:
+        data = src.read()
+        with open(target, "rb") as f:
+            if f.read() == data:
+                return
+        with open(target, "wb") as dst:
+            dst.write(data)
+        return
+
+    with open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def _remove_stale(root: Path, keep: set):
+    """이번 아카이브에 없는 파일/빈 디렉토리 제거 (마커 파일은 유지)"""
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        current = Path(dirpath)
+        for name in filenames:
+            path = current / name
+            if path not in keep and not (current == root and name == SHA_MARKER):
+                path.unlink()
+        if current != root and current not in keep and not any(current.iterdir()):
+            current.rmdir()
+
+
+def _extract_tar(stream, dest_dir: str, commit_sha: str):
+    """tar.gz 스트림을 받는 대로 dest_dir에 압축 해제 (블로킹, 스레드에서 실행)
+
+    이전 커밋의 트리를 지우지 않고 변경된 파일만 덮어쓴 뒤, 사라진 파일을 정리함
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    root = Path(dest_dir).resolve()
+
+    # 갱신 도중 실패하면 캐시로 인정되지 않도록 마커부터 제거
+    (root / SHA_MARKER).unlink(missing_ok=True)
+
+    keep = set()
+    # "r|gz"는 탐색(seek) 없이 순차적으로 읽는 스트리밍 모드
+    with tarfile.open(fileobj=stream, mode="r|gz") as tar:
+        for member in tar:
+            name = _strip_root(member.name)
+            if not name:
+                continue
+            target = _safe_target(root, name)
+            if member.isdir():
+                if target.is_file():
+                    target.unlink()
+                target.mkdir(parents=True, exist_ok=True)
+            elif member.isfile():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                _sync_member(tar, member, target)
+            else:
+                # 심볼릭/하드 링크, 장치 파일 등은 스캔 대상이 아니므로 생략
+                continue
+            keep.add(target)
+
+    _remove_stale(root, keep)
+
+    # 완료 마커는 마지막에 기록 (중간에 실패하면 캐시로 인정되지 않음)
+    with open(os.path.join(dest_dir, SHA_MARKER), "w", encoding="utf-8") as f:
+        f.write(commit_sha)
+
+
+def _extract_from_pipe(pipe: _ChunkPipe, dest_dir: str, commit_sha: str):
+    """압축 해제 스레드 본체 - 성공/실패와 관계없이 끝나면 파이프에 읽기 종료를 알림"""
+    try:
+        _extract_tar(pipe, dest_dir, commit_sha)
+    finally:
+        pipe.close_reader()
+
+
+async def download_repo_zip(repo_full_name: str, commit_sha: str, token: str, dest_dir: str,
+                            client: httpx.AsyncClient):
     """
     repo_full_name: "owner/repo"
     commit_sha: "abc123..."
     token: GitHub Personal Access Token
     dest_dir: 다운로드 후 압축 해제할 디렉토리
+    client: create_http_client()로 생성한 공유 AsyncClient
+
+    이름은 기존 호환을 위해 유지하지만, 실제로는 tarball을 받아 스트리밍으로 압축 해제함
     """
-    url = f"https://api.github.com/repos/{repo_full_name}/zipball/{commit_sha}"
+    url = f"https://api.github.com/repos/{repo_full_name}/tarball/{commit_sha}"
     headers = {
         "Authorization": f"token {token}",
         "Accept": "application/vnd.github+json"
     }
 
-    print("📥 GitHub 레포 ZIP 다운로드 중:", url)
-    r = requests.get(url, headers=headers)
-
-    if r.status_code != 200:
-        raise Exception(f"Download failed: {r.status_code} {r.text}")
-
-    # 기존 디렉토리 삭제
-    if os.path.exists(dest_dir):
-        shutil.rmtree(dest_dir)
-    os.makedirs(dest_dir, exist_ok=True)
+    logger.info("📥 GitHub 레포 tarball 다운로드 중: %s", url)
+    async with client.stream("GET", url, headers=headers) as r:
+        if r.status_code != 200:
+            body = await r.aread()
+            raise Exception(f"Download failed: {r.status_code} {body.decode(errors='replace')}")
 
-    # ZIP 압축 해제
-    with zipfile.ZipFile(io.BytesIO(r.content)) as z:
-        z.extractall(dest_dir)
+        # 네트워크 수신과 압축 해제를 겹쳐서 진행 (전체 아카이브를 버퍼링하지 않음)
+        pipe = _ChunkPipe(asyncio.get_running_loop())
+        extract = _start_thread(_extract_from_pipe, pipe, dest_dir, commit_sha)
+        try:
+            async for chunk in r.aiter_bytes(CHUNK_SIZE):
+                if not await pipe.feed(chunk):
+                    break
+        except BaseException:
+            # 다운로드가 중간에 실패/취소되면 EOF를 넣어 압축 해제 스레드를 끝낸 뒤 원래 예외를 전달
+            pipe.finish()
+            await asyncio.gather(extract, return_exceptions=True)
+            raise
+        pipe.finish()
+        await extract
 
-    print("📦 ZIP 다운로드 & 압축 해제 완료:", dest_dir)
+    logger.info("📦 tarball 다운로드 & 압축 해제 완료: %s", dest_dir)
     return dest_dir
@@ -1,177 +1,429 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from github_client import download_repo_zip
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
+from github_client import download_repo_zip, create_http_client, is_repo_cached, remove_repo_dir
 from semgrep_runner import run_semgrep
 from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from monitoring.monitoring_api import router as monitoring_router  # 추가 1
-import json
+from monitoring.monitoring_module import SEV_DEFAULT_IDX, SEV_IDX, SEVERITIES
+import asyncio
+import atexit
+import itertools
+import logging
+import orjson
 import os
-from collections import defaultdict
+import queue
+import re
+import tempfile
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import lru_cache, partial
+from logging.handlers import QueueHandler, QueueListener
+from operator import itemgetter
 
 # 현재 파일의 디렉토리 기준으로 .env 파일 찾기
 env_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(env_path)
 
-app = FastAPI()
-templates = Jinja2Templates(directory="templates")
+
+def _setup_logging() -> QueueListener:
+    # 요청 처리 경로에서는 큐에 넣기만 하고, 출력은 리스너 스레드 하나가 담당
+    log_queue = queue.Queue(-1)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+
+    root_logger = logging.getLogger()
+    root_logger.addHandler(QueueHandler(log_queue))
+    root_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    return listener
+
+
+_log_listener = _setup_logging()
+atexit.register(_log_listener.stop)
+logger = logging.getLogger(__name__)
+
+
+# 동시에 실행할 스캔 수 (워커 태스크 = Semgrep 프로세스 풀 크기)
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS") or os.cpu_count() or 1)
+# 스캔마다 Semgrep에 줄 병렬 작업 수 (동시 스캔 수만큼 코어를 나눠 과다 할당 방지)
+SEMGREP_JOBS = max(1, (os.cpu_count() or 1) // SCAN_WORKERS)
+# 메모리에 보관할 최근 작업 상태 개수
+MAX_TRACKED_JOBS = 200
+# job_id 끝에 붙이는 프로세스 내 일련번호 (같은 초에 같은 커밋이 다시 와도 겹치지 않도록)
+_job_seq = itertools.count(1)
+# 작업 디렉토리(tmpfs)에 남겨 둘 최근 레포 수 (초과분은 오래 쓰지 않은 순으로 삭제, 0이면 스캔마다 삭제)
+MAX_CACHED_REPOS = int(os.getenv("MAX_CACHED_REPOS") or 4)
+
+
+def _init_scan_process():
+    # 자식 프로세스에는 부모의 로그 리스너 스레드가 없으므로 stderr로 직접 출력
+    root_logger = logging.getLogger()
+    root_logger.handlers.clear()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root_logger.addHandler(handler)
+    root_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 웹훅 간에 공유하는 HTTP 클라이언트 (커넥션 풀 재사용)
+    app.state.http_client = create_http_client()
+    # 웹훅은 작업만 큐에 넣고 즉시 응답, 스캔은 백그라운드 워커가 처리
+    app.state.scan_queue = asyncio.Queue()
+    app.state.jobs = OrderedDict()
+    app.state.latest_result_path = None
+    # 같은 레포에 대한 작업만 직렬화 (레포마다 작업 디렉토리가 따로 있음)
+    app.state.repo_locks = defaultdict(asyncio.Lock)
+    # 작업 디렉토리가 남아 있는 레포 (오래 쓰지 않은 순 → 최근 순)
+    app.state.cached_repos = _load_cached_repos()
+    await _evict_repo_dirs(app)
+    # Semgrep 실행/결과 파싱은 별도 프로세스에서 처리해 GIL과 이벤트 루프를 막지 않음
+    app.state.scan_executor = ProcessPoolExecutor(
+        max_workers=SCAN_WORKERS, initializer=_init_scan_process
+    )
+    workers = [asyncio.create_task(scan_worker(app)) for _ in range(SCAN_WORKERS)]
+    try:
+        yield
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        app.state.scan_executor.shutdown(cancel_futures=True)
+        await app.state.http_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+# 컴파일된 템플릿을 디스크에 캐시해 재시작 시 파싱 생략, 운영 중에는 파일 변경 확인 안 함
+# (디렉토리를 지정하지 않으면 Jinja가 사용자 전용 디렉토리를 만들고 소유자/권한을 검사함)
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader("templates"),
+        autoescape=True,
+        auto_reload=False,
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
+)
+# 시작 시 미리 로드해 첫 /report 요청에서 컴파일하지 않도록 함
+templates.get_template("report.html")
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
-print(f"토큰 로드 상태: {'로드됨' if GITHUB_TOKEN else 'None입니다!'}")
-print(f"토큰 길이: {len(GITHUB_TOKEN) if GITHUB_TOKEN else 0}")
-print(f".env 파일 경로: {env_path}")
-print(f".env 파일 존재: {os.path.exists(env_path)}")
+if not GITHUB_TOKEN:
+    logger.warning("GITHUB_TOKEN이 설정되지 않았습니다!")
+logger.debug("토큰 길이: %d", len(GITHUB_TOKEN) if GITHUB_TOKEN else 0)
+logger.debug(".env 파일 경로: %s (존재: %s)", env_path, os.path.exists(env_path))
 
 # 모니터링 API 라우터 추가 (이것만 추가!)
 app.include_router(monitoring_router)  # 추가 2
 
-DOWNLOAD_DIR = "./downloaded_repo"
-RESULT_JSON_PATH = os.path.join(DOWNLOAD_DIR, "result.json")
+
+def _resolve_scratch_dir() -> str:
+    # 압축 해제/스캔용 작업 디렉토리는 가능하면 tmpfs(RAM)에 둠
+    scratch = os.getenv("SCRATCH_DIR", "/dev/shm/semgrep_scratch")
+    try:
+        os.makedirs(scratch, exist_ok=True)
+        return scratch
+    except OSError:
+        # /dev/shm이 없는 환경(macOS, Windows 등)은 시스템 임시 디렉토리 사용
+        return tempfile.mkdtemp(prefix="semgrep_scratch_")
+
+
+DOWNLOAD_DIR = _resolve_scratch_dir()
+# 스캔 결과 JSON 보관 위치 (monitoring_integration.py가 이 디렉토리를 수집)
+SEMGREP_RESULTS_DIR = "./semgrep_results"
+
+# GitHub "owner/repo" 형식 (작업 디렉토리 이름으로 쓰이므로 경로 조작 문자 차단)
+# owner는 GitHub 규칙대로 영문/숫자/"-"만 허용 - 디렉토리 이름의 첫 "__"가 항상 구분자가 됨
+_REPO_NAME_RE = re.compile(r"^[A-Za-z0-9-]+/[A-Za-z0-9_.-]+$")
+
+
+def _repo_work_dir(repo: str) -> str:
+    # 레포마다 별도 디렉토리를 써서 동시 스캔이 서로 덮어쓰지 않도록 함
+    return os.path.join(DOWNLOAD_DIR, repo.replace("/", "__"))
+
+
+def _load_cached_repos() -> OrderedDict:
+    # 이전 실행에서 남은 작업 디렉토리를 수정 시각 순으로 등록 (owner에는 "_"가 없으므로 첫 "__"에서 분리)
+    found = []
+    with os.scandir(DOWNLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_dir() and "__" in entry.name:
+                found.append((entry.stat().st_mtime, entry.name.replace("__", "/", 1)))
+    return OrderedDict((repo, None) for _, repo in sorted(found))
+
+
+async def _evict_repo_dirs(app: FastAPI):
+    # MAX_CACHED_REPOS를 넘는 작업 디렉토리를 오래 쓰지 않은 순으로 삭제해 tmpfs가 가득 차지 않도록 함
+    cached = app.state.cached_repos
+    for repo in list(cached):
+        if len(cached) <= MAX_CACHED_REPOS:
+            break
+        lock = app.state.repo_locks[repo]
+        # 스캔 중(또는 대기 중)인 레포는 건너뜀
+        if lock.locked():
+            continue
+        async with lock:
+            cached.pop(repo, None)
+            logger.info("🧹 작업 디렉토리 정리: %s", repo)
+            await asyncio.to_thread(remove_repo_dir, _repo_work_dir(repo))
+
+
+_SORT_KEY = itemgetter("_rank", "path", "start_line")
+_PATH_KEY = itemgetter(0)
+
+
+def _build_item(r: dict) -> dict:
+    # Semgrep 결과 1건을 리포트용 dict로 변환 (dict.get은 지역 변수로 바인딩)
+    get = r.get
+    extra = get("extra") or {}
+    get_extra = extra.get
+    get_meta = (get_extra("metadata") or {}).get
+    start = get("start") or {}
+    end = get("end") or {}
+    # 심각도는 모니터링과 같은 기준으로 분류 (알 수 없는 값은 INFO, 정렬 순서 = 인덱스)
+    rank = SEV_IDX.get(get_extra("severity") or get("severity"), SEV_DEFAULT_IDX)
+
+    # 정렬 키로 쓰이는 path/start_line은 None 대신 빈 값으로 채움
+    return {
+        "check_id": get("check_id"),
+        "path": get("path") or "",
+        "start_line": start.get("line") or 0,
+        "end_line": end.get("line"),
+        "message": get_extra("message"),
+        "severity": SEVERITIES[rank],
+        "category": get_meta("category"),
+        "owasp": get_meta("owasp"),
+        "cwe": get_meta("cwe"),
+        "_rank": rank,
+    }
 
 
 def normalize_semgrep_results(data: dict):
     #Semgrep result.json 정규화
-    raw_results = data.get("results", [])
-    normalized = []
-
-    for r in raw_results:
-        extra = r.get("extra", {})
-        meta = extra.get("metadata", {})
-        start = r.get("start", {}) or {}
-        end = r.get("end", {}) or {}
-
-        item = {
-            "check_id": r.get("check_id"),
-            "path": r.get("path"),
-            "start_line": start.get("line"),
-            "end_line": end.get("line"),
-            "message": extra.get("message"),
-            "severity": extra.get("severity") or r.get("severity", "INFO"),  
-            "category": meta.get("category"),
-            "owasp": meta.get("owasp"),
-            "cwe": meta.get("cwe"),
-        }
-        normalized.append(item)
-
-    # 심각도 순서 정의
-    severity_order = {"ERROR": 0, "WARNING": 1, "INFO": 2}
+    normalized = [_build_item(r) for r in data.get("results", [])]
+    normalized.sort(key=_SORT_KEY)
 
-    normalized.sort(
-        key=lambda f: (
-            severity_order.get(f["severity"], 99),
-            f["path"] or "",
-            f["start_line"] or 0,
-        )
-    )
-
-    # 파일별 그룹핑
+    # 파일별 그룹핑 (파일 내 정렬 순서 유지) + 심각도별 개수 (ERROR, WARNING, INFO) 집계
     by_file = defaultdict(list)
+    counts = [0, 0, 0]
     for n in normalized:
         by_file[n["path"]].append(n)
+        counts[n["_rank"]] += 1
 
-    # 요약 정보
-    total = len(normalized)
-    count_error = sum(1 for n in normalized if n["severity"] == "ERROR")
-    count_warning = sum(1 for n in normalized if n["severity"] == "WARNING")
-    count_info = sum(1 for n in normalized if n["severity"] == "INFO")
+    # 템플릿이 순서대로 스트리밍하도록 (path, list) 목록으로 반환
+    by_file = sorted(by_file.items(), key=_PATH_KEY)
 
     return {
         "results": normalized,
-        "by_file": dict(by_file),
-        "total": total,
-        "count_error": count_error,
-        "count_warning": count_warning,
-        "count_info": count_info,
+        "by_file": by_file,
+        "total": len(normalized),
+        "count_error": counts[0],
+        "count_warning": counts[1],
+        "count_info": counts[2],
     }
 
 
-@app.post("/webhook")
-async def webhook_handler(request: Request):
-    try:
-        payload = await request.json()
-        print("🚨 Webhook 수신!", payload.get("repository", {}))
+@lru_cache(maxsize=16)
+def _load_and_normalize(path: str, mtime: float):
+    # mtime을 캐시 키에 포함시켜 파일이 갱신되면 자동으로 새로 읽음
+    # (반환값은 캐시와 공유되므로 호출 측에서 수정하지 않아야 함)
+    with open(path, "rb") as f:
+        data = orjson.loads(f.read())
+    return normalize_semgrep_results(data)
 
-        # 필수 필드 검증
-        repo = payload.get("repository", {}).get("full_name")
-        commit_sha = payload.get("after")
 
-        if not repo:
-            raise HTTPException(status_code=400, detail="repository.full_name이 필요합니다")
-        if not commit_sha:
-            raise HTTPException(status_code=400, detail="after (commit SHA)가 필요합니다")
+def _download_error_detail(error_msg: str, repo: str, commit_sha: str) -> str:
+    if "404" in error_msg or "Not Found" in error_msg:
+        return f"레포지토리를 찾을 수 없습니다: {repo} (또는 커밋 SHA가 유효하지 않음: {commit_sha[:8]}...)"
+    if "401" in error_msg or "Bad credentials" in error_msg:
+        return "GitHub 인증 실패. GITHUB_TOKEN을 확인하세요."
+    return f"GitHub 다운로드 실패: {error_msg}"
+
+
+async def _run_scan_job(app: FastAPI, job: dict):
+    repo = job["repo"]
+    commit_sha = job["commit"]
+    work_dir = _repo_work_dir(repo)
+
+    # 같은 레포의 이전 작업이 끝날 때까지 대기 (다른 레포는 병렬로 진행)
+    async with app.state.repo_locks[repo]:
+        job["status"] = "running"
+        app.state.cached_repos[repo] = None
+        app.state.cached_repos.move_to_end(repo)
 
-        # 1) GitHub에서 코드 ZIP 다운로드
+        # 1) GitHub에서 코드 tarball 다운로드 (같은 커밋이 이미 있으면 생략)
         try:
-            download_repo_zip(repo, commit_sha, GITHUB_TOKEN, DOWNLOAD_DIR)
+            if is_repo_cached(work_dir, commit_sha):
+                logger.info("♻️  캐시된 소스 사용: %s@%s", repo, commit_sha[:8])
+            else:
+                await download_repo_zip(
+                    repo, commit_sha, GITHUB_TOKEN, work_dir, app.state.http_client
+                )
         except Exception as e:
             error_msg = str(e)
-            print(f"GitHub 다운로드 실패: {error_msg}")
+            logger.error("GitHub 다운로드 실패: %s", error_msg)
+            job["status"] = "error"
+            job["error"] = _download_error_detail(error_msg, repo, commit_sha)
+            return
+
+        # 2) Semgrep 실행 (프로세스 풀에서 실행)
+        loop = asyncio.get_running_loop()
+        # (/report와 모니터링 수집에서 읽을 수 있도록 결과 JSON 보관)
+        result = await loop.run_in_executor(
+            app.state.scan_executor,
+            partial(run_semgrep, work_dir, output_dir=SEMGREP_RESULTS_DIR, jobs=SEMGREP_JOBS),
+        )
 
-            if "404" in error_msg or "Not Found" in error_msg:
-                raise HTTPException(
-                    status_code=404,
-                    detail=f"레포지토리를 찾을 수 없습니다: {repo} (또는 커밋 SHA가 유효하지 않음: {commit_sha[:8]}...)",
-                )
-            elif "401" in error_msg or "Bad credentials" in error_msg:
-                raise HTTPException(
-                    status_code=401,
-                    detail="GitHub 인증 실패. GITHUB_TOKEN을 확인하세요.",
-                )
-            else:
-                raise HTTPException(status_code=500, detail=f"GitHub 다운로드 실패: {error_msg}")
+    if result.get("status") != "completed":
+        logger.error("Semgrep 실행 실패: %s", result.get("message"))
+        job["status"] = "error"
+        job["error"] = f"Semgrep 실행 실패: {result.get('message')}"
+        return
+
+    # 3) 요약은 스캔 프로세스에서 이미 집계한 값을 사용 (결과 JSON을 루프에서 다시 파싱하지 않음)
+    app.state.latest_result_path = result["output_file"]
+
+    job["status"] = "completed"
+    job["summary"] = {
+        "total": result["total_findings"],
+        "error": result["errors"],
+        "warning": result["warnings"],
+        "info": result["infos"],
+    }
 
-        # 2) Semgrep 실행
+
+async def scan_worker(app: FastAPI):
+    queue = app.state.scan_queue
+    while True:
+        job = await queue.get()
         try:
-            result = run_semgrep(DOWNLOAD_DIR)
+            await _run_scan_job(app, job)
         except Exception as e:
-            error_msg = str(e)
-            print(f"Semgrep 실행 실패: {error_msg}")
-            raise HTTPException(status_code=500, detail=f"Semgrep 실행 실패: {error_msg}")
+            logger.exception("예상치 못한 에러: %s", e)
+            job["status"] = "error"
+            job["error"] = f"서버 에러: {e}"
+        finally:
+            queue.task_done()
+        try:
+            await _evict_repo_dirs(app)
+        except Exception as e:
+            logger.exception("작업 디렉토리 정리 실패: %s", e)
+
+
+@app.post("/webhook", status_code=202)
+async def webhook_handler(request: Request):
+    try:
+        # Starlette의 request.json() 대신 원본 바이트를 orjson으로 한 번만 파싱
+        try:
+            payload = orjson.loads(await request.body())
+        except orjson.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="JSON 본문이 올바르지 않습니다")
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail="JSON 객체가 필요합니다")
+        repository = payload.get("repository")
+        if not isinstance(repository, dict):
+            raise HTTPException(status_code=400, detail="repository 객체가 필요합니다")
+
+        # 필수 필드 검증
+        repo = repository.get("full_name")
+        commit_sha = payload.get("after")
+        logger.info("🚨 Webhook 수신! %s", repo)
+
+        if not repo or not isinstance(repo, str):
+            raise HTTPException(status_code=400, detail="repository.full_name이 필요합니다")
+        if not _REPO_NAME_RE.match(repo):
+            raise HTTPException(status_code=400, detail="repository.full_name은 owner/repo 형식이어야 합니다")
+        if not commit_sha or not isinstance(commit_sha, str):
+            raise HTTPException(status_code=400, detail="after (commit SHA)가 필요합니다")
 
-        # 3) 정규화된 요약 생성
-        normalized = normalize_semgrep_results(result)
+        # 스캔 작업 등록 후 즉시 응답 (GitHub 웹훅은 10초 내 응답 권장)
+        # 시각/커밋은 읽기 쉬운 접두어이고, 고유성은 일련번호로 보장
+        job_id = f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit_sha[:8]}_{next(_job_seq)}"
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "repo": repo,
+            "commit": commit_sha,
+            "queued_at": datetime.now().isoformat(),
+        }
+        jobs = request.app.state.jobs
+        jobs[job_id] = job
+        while len(jobs) > MAX_TRACKED_JOBS:
+            jobs.popitem(last=False)
+        await request.app.state.scan_queue.put(job)
 
-        # 4) JSON 응답 + 리포트 URL
         return {
-            "status": "ok",
+            "status": "queued",
+            "job_id": job_id,
             "repo": repo,
             "commit": commit_sha,
-            "summary": {
-                "total": normalized["total"],
-                "error": normalized["count_error"],
-                "warning": normalized["count_warning"],
-                "info": normalized["count_info"],
-            },
+            "job_url": f"/jobs/{job_id}",
             "report_url": "/report",
         }
     except HTTPException:
         raise
     except Exception as e:
         error_msg = str(e)
-        print(f"예상치 못한 에러: {error_msg}")
+        logger.exception("예상치 못한 에러: %s", error_msg)
         raise HTTPException(status_code=500, detail=f"서버 에러: {error_msg}")
 
 
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    return job
+
+
+def _latest_archived_result():
+    # 보관된 스캔 결과 중 가장 최근 파일 (없으면 None)
+    try:
+        with os.scandir(SEMGREP_RESULTS_DIR) as entries:
+            files = [
+                (entry.stat().st_mtime, entry.path)
+                for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            ]
+    except FileNotFoundError:
+        return None
+    return max(files)[1] if files else None
+
+
+def _render_report(context: dict) -> StreamingResponse:
+    # 템플릿을 한 번에 문자열로 만들지 않고 렌더링되는 대로 청크 전송
+    template = templates.env.get_template("report.html")
+    return StreamingResponse(template.generate(context), media_type="text/html")
+
+
 @app.get("/report", response_class=HTMLResponse)
 async def report(request: Request):
-    
-    if not os.path.exists(RESULT_JSON_PATH):
-        return templates.TemplateResponse(
-            "report.html",
+    # 가장 최근에 완료된 스캔 결과 (서버 재시작 직후에는 보관된 결과 중 가장 최근 파일)
+    result_path = request.app.state.latest_result_path
+    if result_path is None:
+        result_path = await asyncio.to_thread(_latest_archived_result)
+        request.app.state.latest_result_path = result_path
+
+    if result_path is None or not os.path.exists(result_path):
+        return _render_report(
             {
                 "request": request,
                 "has_result": False,
                 "generated_at": None,
                 "summary": None,
-                "by_file": {},
+                "by_file": [],
             },
         )
 
-    with open(RESULT_JSON_PATH) as f:
-        data = json.load(f)
-
-    normalized = normalize_semgrep_results(data)
+    # 대용량 결과 파일의 파싱/정렬이 이벤트 루프를 막지 않도록 스레드에서 실행
+    normalized = await asyncio.to_thread(
+        _load_and_normalize, result_path, os.path.getmtime(result_path)
+    )
 
     # 생성 시각 (Semgrep time 정보가 없으면 현재 시간 사용)
     generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -183,8 +435,7 @@ async def report(request: Request):
         "info": normalized["count_info"],
     }
 
-    return templates.TemplateResponse(
-        "report.html",
+    return _render_report(
         {
             "request": request,
             "has_result": True,
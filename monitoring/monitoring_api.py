@@ -7,6 +7,7 @@ from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse
 from typing import Optional, List
 from datetime import datetime, timedelta
+import time
 from pydantic import BaseModel
 
 # monitoring_module에서 임포트
@@ -14,6 +15,27 @@ from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/monitoring", tags=["monitoring"])
 
+# 예시 응답용 타임스탬프 (요청마다 datetime.now()/timedelta를 만들지 않도록 임포트 시 한 번 계산)
+_EXAMPLE_NOW = datetime.now()
+_EXAMPLE_NOW_ISO = _EXAMPLE_NOW.isoformat()
+_EXAMPLE_HOURS_AGO = {h: (_EXAMPLE_NOW - timedelta(hours=h)).isoformat() for h in (1, 2, 3, 5)}
+_EXAMPLE_TREND_DATES = [(_EXAMPLE_NOW - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+_EXAMPLE_PERIOD_START = (_EXAMPLE_NOW - timedelta(days=30)).strftime("%Y-%m-%d")
+_EXAMPLE_PERIOD_END = _EXAMPLE_NOW.strftime("%Y-%m-%d")
+
+# 헬스 체크 타임스탬프 캐시 (최대 1초 간격으로만 갱신)
+_health_timestamp = ""
+_health_checked_at = float("-inf")
+
+
+def _cached_now_iso() -> str:
+    global _health_timestamp, _health_checked_at
+    now = time.monotonic()
+    if now - _health_checked_at > 1.0:
+        _health_timestamp = datetime.now().isoformat()
+        _health_checked_at = now
+    return _health_timestamp
+
 
 # Pydantic 모델 정의
 class RepositoryStats(BaseModel):
@@ -46,6 +68,9 @@ class DashboardSummary(BaseModel):
     recent_scans: List[dict]
 
 
+# 아래 GET 엔드포인트들은 이미 올바른 형태의 응답을 직접 만들어 반환하므로
+# response_model로 응답을 다시 검증하지 않고, 스키마는 responses로 문서화만 함
+
 # 데이터베이스 인스턴스 (실제로는 dependency injection 사용 권장)
 # db = MonitoringDatabase()
 # reporter = MonitoringReport(db)
@@ -56,12 +81,12 @@ async def health_check():
     """헬스 체크 엔드포인트"""
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": _cached_now_iso(),
         "service": "semgrep-monitoring"
     }
 
 
-@router.get("/repositories", response_model=List[str])
+@router.get("/repositories", response_model=None, responses={200: {"model": List[str]}})
 async def list_repositories():
     """
     모든 모니터링 대상 리포지토리 목록 조회
@@ -77,7 +102,8 @@ async def list_repositories():
     ]
 
 
-@router.get("/repositories/{repository}/stats", response_model=RepositoryStats)
+@router.get("/repositories/{repository}/stats", response_model=None,
+            responses={200: {"model": RepositoryStats}})
 async def get_repository_stats(repository: str):
     """
     특정 리포지토리의 통계 정보 조회
@@ -108,14 +134,15 @@ async def get_repository_stats(repository: str):
             {"rule_id": "sql-injection-risk", "count": 2}
         ],
         last_scan={
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": _EXAMPLE_NOW_ISO,
             "findings": 28,
             "duration": 12.5
         }
     )
 
 
-@router.get("/repositories/{repository}/score", response_model=SecurityScore)
+@router.get("/repositories/{repository}/score", response_model=None,
+            responses={200: {"model": SecurityScore}})
 async def get_security_score(repository: str):
     """
     리포지토리 보안 점수 조회
@@ -140,11 +167,12 @@ async def get_security_score(repository: str):
         repository=repository,
         score=85.5,
         grade="B",
-        timestamp=datetime.now().isoformat()
+        timestamp=_EXAMPLE_NOW_ISO
     )
 
 
-@router.get("/repositories/{repository}/trend", response_model=List[TrendData])
+@router.get("/repositories/{repository}/trend", response_model=None,
+            responses={200: {"model": List[TrendData]}})
 async def get_trend_data(
     repository: str,
     days: int = Query(default=30, ge=1, le=365, description="조회할 일수")
@@ -166,9 +194,9 @@ async def get_trend_data(
     # 예시 응답
     trend = []
     for i in range(min(days, 7)):
-        date = datetime.now() - timedelta(days=i)
-        trend.append(TrendData(
-            date=date.strftime("%Y-%m-%d"),
+        # 값이 이미 올바른 타입이므로 검증 없이 생성 (model_construct)
+        trend.append(TrendData.model_construct(
+            date=_EXAMPLE_TREND_DATES[i],
             errors=5 - i,
             warnings=15 - (i * 2),
             infos=8 + i
@@ -176,7 +204,8 @@ async def get_trend_data(
     return trend
 
 
-@router.get("/dashboard/summary", response_model=DashboardSummary)
+@router.get("/dashboard/summary", response_model=None,
+            responses={200: {"model": DashboardSummary}})
 async def get_dashboard_summary():
     """
     대시보드 요약 정보 조회
@@ -197,13 +226,13 @@ async def get_dashboard_summary():
         recent_scans=[
             {
                 "repository": "example-repo-1",
-                "timestamp": (datetime.now() - timedelta(hours=2)).isoformat(),
+                "timestamp": _EXAMPLE_HOURS_AGO[2],
                 "findings": 12,
                 "score": 88.0
             },
             {
                 "repository": "example-repo-2",
-                "timestamp": (datetime.now() - timedelta(hours=5)).isoformat(),
+                "timestamp": _EXAMPLE_HOURS_AGO[5],
                 "findings": 8,
                 "score": 92.5
             }
@@ -240,7 +269,7 @@ async def get_recent_findings(
                 "file_path": "src/config.py",
                 "line_number": 42,
                 "message": "Hardcoded credentials detected",
-                "timestamp": (datetime.now() - timedelta(hours=1)).isoformat()
+                "timestamp": _EXAMPLE_HOURS_AGO[1]
             },
             {
                 "id": 2,
@@ -250,7 +279,7 @@ async def get_recent_findings(
                 "file_path": "src/database.py",
                 "line_number": 156,
                 "message": "Potential SQL injection",
-                "timestamp": (datetime.now() - timedelta(hours=3)).isoformat()
+                "timestamp": _EXAMPLE_HOURS_AGO[3]
             }
         ],
         "total": 2,
@@ -299,8 +328,8 @@ async def get_severity_distribution(
         "total": 243,
         "repository": repository,
         "period": {
-            "start": start_date or (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d"),
-            "end": end_date or datetime.now().strftime("%Y-%m-%d")
+            "start": start_date or _EXAMPLE_PERIOD_START,
+            "end": end_date or _EXAMPLE_PERIOD_END
         }
     }
 
@@ -6,15 +6,46 @@ Semgrep Webhook 모니터링 모듈
 """
 
 import json
-from datetime import datetime
+import orjson
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional
 from collections import defaultdict, Counter
 from dataclasses import dataclass, asdict
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 
+try:
+    # 대용량 결과 파일 스트리밍 파싱용 (선택)
+    import ijson
+except ImportError:
+    ijson = None
 
-@dataclass
+try:
+    # 분석용 컬럼형(Parquet) 취약점 저장소 (선택)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:
+    # Parquet 데이터셋 집계 쿼리용 (선택)
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+# 심각도 분류 기준 (웹훅 요약, /report, 모니터링 DB가 모두 이 표를 사용)
+# 알 수 없는 심각도는 INFO로 분류
+SEVERITIES = ('ERROR', 'WARNING', 'INFO')
+SEV_IDX = {sev: i for i, sev in enumerate(SEVERITIES)}
+SEV_DEFAULT_IDX = SEV_IDX['INFO']
+
+
+# 인스턴스마다 __dict__를 만들지 않도록 slots 사용 (생성 후 값이 바뀌지 않으므로 frozen)
+@dataclass(slots=True, frozen=True)
 class ScanResult:
     """스캔 결과 데이터 모델"""
     scan_id: str
@@ -29,7 +60,7 @@ class ScanResult:
     rules_applied: int
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FindingDetail:
     """개별 취약점 상세 정보"""
     rule_id: str
@@ -43,14 +74,101 @@ class FindingDetail:
 class MonitoringDatabase:
     """모니터링 데이터 저장 및 조회"""
     
-    def __init__(self, db_path: str = "monitoring.db"):
+    # 연결마다 적용되는 성능 설정 (WAL에서는 synchronous=NORMAL로도 커밋 안전성 유지)
+    CONNECTION_PRAGMAS = (
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA cache_size=-65536",
+    )
+    
+    # 저장 경로에서 반복 실행되는 SQL (텍스트가 같아야 연결의 statement 캐시에서 준비된 구문이 재사용됨)
+    _INSERT_SCAN_SQL = """
+        INSERT INTO scan_results (scan_id, repository, commit_sha, timestamp, total_findings,
+                                  error_count, warning_count, info_count, scan_duration, rules_applied)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    _INSERT_FINDING_SQL = """
+        INSERT INTO findings (scan_id, rule_id, severity, category, 
+                            file_path, line_number, message, repository)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    _UPSERT_SUMMARY_SQL = """
+        INSERT INTO repo_summary (repository, severity, count) VALUES (?, ?, ?)
+        ON CONFLICT(repository, severity) DO UPDATE SET count = count + excluded.count
+    """
+    _UPSERT_TREND_SQL = """
+        INSERT INTO repo_trend (repository, date, errors, warnings, infos) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(repository, date) DO UPDATE SET
+            errors = errors + excluded.errors,
+            warnings = warnings + excluded.warnings,
+            infos = infos + excluded.infos
+    """
+    _RECORD_FILE_SQL = """
+        INSERT OR REPLACE INTO processed_files (path, mtime, size, scan_id)
+        VALUES (?, ?, ?, ?)
+    """
+    
+    def __init__(self, db_path: str = "monitoring.db", parquet_dir: Optional[str] = None):
+        """
+        Args:
+            db_path: SQLite DB 경로
+            parquet_dir: 지정하면 취약점 상세를 repository/date 파티션의 Parquet으로도 기록 (pyarrow 필요)
+        """
+        if parquet_dir is not None and pa is None:
+            raise ImportError("parquet_dir를 사용하려면 pyarrow가 필요합니다: pip install pyarrow")
         self.db_path = db_path
+        self.parquet_dir = parquet_dir
+        # 호출마다 다시 연결하지 않고 하나의 연결을 유지 (페이지 캐시/PRAGMA 재사용)
+        # 트랜잭션은 직접 BEGIN/COMMIT으로 관리하고, 스레드 간 공유는 lock으로 직렬화
+        # (스키마가 늘어나도 저장 경로의 준비된 구문이 밀려나지 않도록 statement 캐시를 넉넉히)
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False,
+                                     cached_statements=1024)
+        self._lock = threading.RLock()
+        # stage()로 모아 둔 일괄 저장 대기 행
+        self._staged_scans: List[tuple] = []
+        self._staged_findings: List[tuple] = []
+        self._staged_files: List[tuple] = []
+        for pragma in self.CONNECTION_PRAGMAS:
+            self._conn.execute(pragma)
         self.init_database()
     
+    def close(self):
+        """연결 종료"""
+        with self._lock:
+            self._conn.close()
+    
+    @contextmanager
+    def _transaction(self):
+        """쓰기용 커서 (블록이 끝나면 COMMIT, 예외 시 ROLLBACK)"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+    
+    @contextmanager
+    def _read(self):
+        """읽기용 커서"""
+        with self._lock:
+            yield self._conn.cursor()
+    
     def init_database(self):
         """데이터베이스 초기화"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        # WAL 모드는 DB 파일에 저장되며 트랜잭션 밖에서 설정해야 함
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        
+        with self._transaction() as cursor:
+            existing_tables = {
+                name for (name,) in cursor.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'"
+                )
+            }
             
             # 스캔 결과 테이블
             cursor.execute("""
@@ -79,10 +197,44 @@ class MonitoringDatabase:
                     file_path TEXT,
                     line_number INTEGER,
                     message TEXT,
+                    repository TEXT,
                     FOREIGN KEY (scan_id) REFERENCES scan_results (scan_id)
                 )
             """)
             
+            # 리포지토리별 누적 집계 (저장 시 함께 갱신 - 대시보드 조회를 점 조회로 처리)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS repo_summary (
+                    repository TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (repository, severity)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS repo_trend (
+                    repository TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    errors INTEGER NOT NULL,
+                    warnings INTEGER NOT NULL,
+                    infos INTEGER NOT NULL,
+                    PRIMARY KEY (repository, date)
+                )
+            """)
+            
+            # 이미 수집한 결과 파일 기록 (경로/수정시각/크기가 같으면 다시 파싱하지 않음)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS processed_files (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    scan_id TEXT
+                )
+            """)
+            
+            # 이전 스키마로 만들어진 DB 갱신
+            self._migrate(cursor, existing_tables)
+            
             # 인덱스 생성
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_repository 
@@ -92,130 +244,250 @@ class MonitoringDatabase:
                 CREATE INDEX IF NOT EXISTS idx_timestamp 
                 ON scan_results(timestamp)
             """)
+            # 리포지토리별 최근 스캔 조회 (정렬 없이 인덱스 순서로 읽음)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_repository_timestamp 
+                ON scan_results(repository, timestamp)
+            """)
+            # 전체 리포지토리 트렌드의 날짜 범위 검색
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_repo_trend_date 
+                ON repo_trend(date)
+            """)
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_severity 
                 ON findings(severity)
             """)
-            
-            conn.commit()
+            # 스캔별 조회/심각도 집계용 복합 인덱스 (scan_id 단독 조회도 이 인덱스로 처리)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_findings_scan_sev 
+                ON findings(scan_id, severity)
+            """)
+            # 리포지토리별 심각도/규칙 집계를 JOIN 없이 커버링 인덱스로 처리
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_findings_repo_sev 
+                ON findings(repository, severity)
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_findings_repo_rule 
+                ON findings(repository, rule_id)
+            """)
+    
+    @staticmethod
+    def _migrate(cursor: sqlite3.Cursor, existing_tables: set):
+        """누락된 컬럼 추가 및 기존 데이터 채우기"""
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(findings)")}
+        if 'repository' not in columns:
+            cursor.execute("ALTER TABLE findings ADD COLUMN repository TEXT")
+            cursor.execute("""
+                UPDATE findings SET repository = (
+                    SELECT s.repository FROM scan_results s WHERE s.scan_id = findings.scan_id
+                )
+            """)
+        
+        # 집계 테이블이 새로 생겼으면 기존 데이터로 채움
+        if 'repo_summary' not in existing_tables:
+            cursor.execute("""
+                INSERT INTO repo_summary (repository, severity, count)
+                SELECT repository, severity, COUNT(*)
+                FROM findings
+                WHERE repository IS NOT NULL
+                GROUP BY repository, severity
+            """)
+        if 'repo_trend' not in existing_tables:
+            cursor.execute("""
+                INSERT INTO repo_trend (repository, date, errors, warnings, infos)
+                SELECT repository, DATE(timestamp),
+                       SUM(error_count), SUM(warning_count), SUM(info_count)
+                FROM scan_results
+                GROUP BY repository, DATE(timestamp)
+            """)
+    
+    @staticmethod
+    def _scan_row(result: ScanResult) -> tuple:
+        return (
+            result.scan_id,
+            result.repository,
+            result.commit_sha,
+            result.timestamp,
+            result.total_findings,
+            result.error_count,
+            result.warning_count,
+            result.info_count,
+            result.scan_duration,
+            result.rules_applied
+        )
+    
+    @staticmethod
+    def _finding_rows(result: ScanResult, findings: List[FindingDetail]) -> List[tuple]:
+        return [
+            (result.scan_id, f.rule_id, f.severity, f.category,
+             f.file_path, f.line_number, f.message, result.repository)
+            for f in findings
+        ]
+    
+    @classmethod
+    def _insert_rows(cls, cursor: sqlite3.Cursor, scan_rows: List[tuple], finding_rows: List[tuple]):
+        """스캔 결과/취약점 상세를 executemany로 일괄 삽입"""
+        cursor.executemany(cls._INSERT_SCAN_SQL, scan_rows)
+        cursor.executemany(cls._INSERT_FINDING_SQL, finding_rows)
+        
+        # 누적 집계 갱신 (같은 트랜잭션 안에서 upsert)
+        # finding_rows: (..., severity는 2번, repository는 7번 인덱스)
+        severity_totals = Counter((row[7], row[2]) for row in finding_rows)
+        cursor.executemany(cls._UPSERT_SUMMARY_SQL,
+                           [(repo, sev, cnt) for (repo, sev), cnt in severity_totals.items()])
+        
+        # scan_rows: (repository는 1번, timestamp는 3번, error/warning/info는 5~7번 인덱스)
+        # ISO 형식 timestamp의 앞 10자리는 DATE(timestamp)와 같음
+        trend_totals = defaultdict(lambda: [0, 0, 0])
+        for row in scan_rows:
+            totals = trend_totals[(row[1], row[3][:10])]
+            totals[0] += row[5] or 0
+            totals[1] += row[6] or 0
+            totals[2] += row[7] or 0
+        cursor.executemany(cls._UPSERT_TREND_SQL,
+                           [(repo, date, *totals) for (repo, date), totals in trend_totals.items()])
+    
+    def _write_parquet(self, scan_rows: List[tuple], finding_rows: List[tuple]):
+        """취약점 상세를 컬럼 단위로 모아 repository/date 파티션 Parquet 파일로 추가 기록"""
+        if self.parquet_dir is None or not finding_rows:
+            return
+        # scan_rows: (scan_id는 0번, timestamp는 3번 인덱스) - 취약점마다 스캔 날짜를 붙임
+        scan_dates = {row[0]: row[3][:10] for row in scan_rows}
+        columns = list(zip(*finding_rows))
+        # 반복이 많은 문자열 컬럼은 사전(dictionary) 인코딩
+        table = pa.table({
+            "scan_id": pa.array(columns[0], pa.string()),
+            "rule_id": pa.array(columns[1], pa.string()).dictionary_encode(),
+            "severity": pa.array(columns[2], pa.string()).dictionary_encode(),
+            "category": pa.array(columns[3], pa.string()).dictionary_encode(),
+            "file_path": pa.array(columns[4], pa.string()),
+            "line_number": pa.array(columns[5], pa.int64()),
+            "message": pa.array(columns[6], pa.string()),
+            "repository": pa.array(columns[7], pa.string()),
+            "date": pa.array([scan_dates[scan_id] for scan_id in columns[0]], pa.string()),
+        })
+        pq.write_to_dataset(table, self.parquet_dir, partition_cols=["repository", "date"])
     
     def save_scan_result(self, result: ScanResult, findings: List[FindingDetail]):
         """스캔 결과 저장"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # 스캔 결과 저장
+        scan_rows, finding_rows = [self._scan_row(result)], self._finding_rows(result, findings)
+        # 스캔 결과와 취약점 상세를 하나의 트랜잭션으로 저장 (커밋/fsync 1회)
+        with self._transaction() as cursor:
+            self._insert_rows(cursor, scan_rows, finding_rows)
+        self._write_parquet(scan_rows, finding_rows)
+    
+    def stage(self, result: ScanResult, findings: List[FindingDetail],
+              source: Optional[tuple] = None):
+        """스캔 결과를 바로 저장하지 않고 모아 둠 (flush_all에서 일괄 저장)
+        
+        source: 결과 파일의 (path, mtime, size) - 주면 저장과 함께 처리 완료로 기록
+        """
+        self._staged_scans.append(self._scan_row(result))
+        self._staged_findings.extend(self._finding_rows(result, findings))
+        if source is not None:
+            self._staged_files.append((*source, result.scan_id))
+    
+    def flush_all(self) -> int:
+        """stage로 모아 둔 결과를 하나의 트랜잭션으로 저장하고, 저장한 스캔 수 반환"""
+        scan_rows, finding_rows = self._staged_scans, self._staged_findings
+        if not scan_rows:
+            return 0
+        with self._transaction() as cursor:
+            self._insert_rows(cursor, scan_rows, finding_rows)
+            cursor.executemany(self._RECORD_FILE_SQL, self._staged_files)
+        self._write_parquet(scan_rows, finding_rows)
+        self._staged_scans, self._staged_findings, self._staged_files = [], [], []
+        return len(scan_rows)
+    
+    def already_processed(self, path: str, mtime: float, size: int) -> bool:
+        """같은 경로/수정시각/크기의 결과 파일을 이미 수집했는지 확인"""
+        with self._read() as cursor:
             cursor.execute("""
-                INSERT INTO scan_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                result.scan_id,
-                result.repository,
-                result.commit_sha,
-                result.timestamp,
-                result.total_findings,
-                result.error_count,
-                result.warning_count,
-                result.info_count,
-                result.scan_duration,
-                result.rules_applied
-            ))
-            
-            # 취약점 상세 저장
-            for finding in findings:
-                cursor.execute("""
-                    INSERT INTO findings (scan_id, rule_id, severity, category, 
-                                        file_path, line_number, message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    result.scan_id,
-                    finding.rule_id,
-                    finding.severity,
-                    finding.category,
-                    finding.file_path,
-                    finding.line_number,
-                    finding.message
-                ))
-            
-            conn.commit()
+                SELECT 1 FROM processed_files WHERE path = ? AND mtime = ? AND size = ?
+            """, (path, mtime, size))
+            return cursor.fetchone() is not None
+    
+    # 리포지토리 통계 4종(스캔 수, 심각도 분포, Top 5 규칙, 최근 스캔)을 한 번의 쿼리로 조회
+    # 각 행은 (kind, key, value, extra) 형식
+    _REPOSITORY_STATS_SQL = """
+        SELECT 'total' AS kind, NULL AS key, COUNT(*) AS value, NULL AS extra
+        FROM scan_results WHERE repository = :repo
+        UNION ALL
+        -- 심각도 3종을 한 행으로 집계 (항목이 없어도 0으로 채워져 항상 반환됨)
+        SELECT 'severity',
+               COALESCE(SUM(CASE severity WHEN 'ERROR' THEN count ELSE 0 END), 0),
+               COALESCE(SUM(CASE severity WHEN 'WARNING' THEN count ELSE 0 END), 0),
+               -- 분류 이전에 저장된 알 수 없는 심각도도 INFO로 집계
+               COALESCE(SUM(CASE WHEN severity IN ('ERROR', 'WARNING') THEN 0 ELSE count END), 0)
+        FROM repo_summary WHERE repository = :repo
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'top', rule_id, COUNT(*) AS cnt, NULL
+            FROM findings WHERE repository = :repo
+            GROUP BY rule_id
+            ORDER BY cnt DESC
+            LIMIT 5
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'last', timestamp, total_findings, scan_duration
+            FROM scan_results WHERE repository = :repo
+            ORDER BY timestamp DESC
+            LIMIT 1
+        )
+        ORDER BY kind, value DESC
+    """
     
     def get_repository_stats(self, repository: str) -> Dict:
         """리포지토리별 통계"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # 총 스캔 횟수
-            cursor.execute("""
-                SELECT COUNT(*) FROM scan_results WHERE repository = ?
-            """, (repository,))
-            total_scans = cursor.fetchone()[0]
-            
-            # 심각도별 취약점 수
-            cursor.execute("""
-                SELECT f.severity, COUNT(*)
-                FROM findings f
-                JOIN scan_results s ON f.scan_id = s.scan_id
-                WHERE s.repository = ?
-                GROUP BY f.severity
-            """, (repository,))
-            severity_counts = dict(cursor.fetchall())
-            
-            # 가장 많이 발견된 취약점 Top 5
-            cursor.execute("""
-                SELECT f.rule_id, COUNT(*) as cnt
-                FROM findings f
-                JOIN scan_results s ON f.scan_id = s.scan_id
-                WHERE s.repository = ?
-                GROUP BY f.rule_id
-                ORDER BY cnt DESC
-                LIMIT 5
-            """, (repository,))
-            top_issues = cursor.fetchall()
-            
-            # 최근 스캔 정보
-            cursor.execute("""
-                SELECT timestamp, total_findings, scan_duration
-                FROM scan_results
-                WHERE repository = ?
-                ORDER BY timestamp DESC
-                LIMIT 1
-            """, (repository,))
-            last_scan = cursor.fetchone()
-            
-            return {
-                "repository": repository,
-                "total_scans": total_scans,
-                "severity_distribution": severity_counts,
-                "top_issues": [{"rule_id": r, "count": c} for r, c in top_issues],
-                "last_scan": {
-                    "timestamp": last_scan[0],
-                    "findings": last_scan[1],
-                    "duration": last_scan[2]
-                } if last_scan else None
-            }
+        with self._read() as cursor:
+            rows = cursor.execute(self._REPOSITORY_STATS_SQL, {"repo": repository}).fetchall()
+        
+        total_scans = 0
+        severity_counts = None
+        top_issues = []
+        last_scan = None
+        for kind, key, value, extra in rows:
+            if kind == 'total':
+                total_scans = value
+            elif kind == 'severity':
+                severity_counts = {"ERROR": key, "WARNING": value, "INFO": extra}
+            elif kind == 'top':
+                top_issues.append({"rule_id": key, "count": value})
+            else:
+                last_scan = {"timestamp": key, "findings": value, "duration": extra}
+        
+        return {
+            "repository": repository,
+            "total_scans": total_scans,
+            "severity_distribution": severity_counts,
+            "top_issues": top_issues,
+            "last_scan": last_scan
+        }
     
     def get_trend_data(self, repository: Optional[str] = None, days: int = 30) -> List[Dict]:
-        """취약점 트렌드 데이터"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT 
-                    DATE(timestamp) as date,
-                    SUM(error_count) as errors,
-                    SUM(warning_count) as warnings,
-                    SUM(info_count) as infos
-                FROM scan_results
-                WHERE datetime(timestamp) >= datetime('now', '-' || ? || ' days')
-            """
-            params = [days]
-            
+        """취약점 트렌드 데이터 (저장 시 누적된 repo_trend에서 조회)"""
+        with self._read() as cursor:
+            # 기준 날짜는 파이썬에서 계산해 상수로 비교 (컬럼에 함수를 씌우지 않아 인덱스 범위 검색 가능)
+            # timestamp가 로컬 시간으로 저장되므로 기준도 로컬 날짜 사용
+            since = (date.today() - timedelta(days=days)).isoformat()
             if repository:
-                query += " AND repository = ?"
-                params.append(repository)
-            
-            query += " GROUP BY DATE(timestamp) ORDER BY date"
-            
-            cursor.execute(query, params)
+                cursor.execute("""
+                    SELECT date, errors, warnings, infos
+                    FROM repo_trend
+                    WHERE repository = ? AND date >= ?
+                    ORDER BY date
+                """, (repository, since))
+            else:
+                cursor.execute("""
+                    SELECT date, SUM(errors), SUM(warnings), SUM(infos)
+                    FROM repo_trend
+                    WHERE date >= ?
+                    GROUP BY date
+                    ORDER BY date
+                """, (since,))
             
             return [
                 {
@@ -226,51 +498,127 @@ class MonitoringDatabase:
                 }
                 for row in cursor.fetchall()
             ]
+    
+    def get_findings_trend_parquet(self, repository: Optional[str] = None, days: int = 30) -> List[Dict]:
+        """Parquet 취약점 데이터셋에서 DuckDB로 트렌드 집계 (get_trend_data와 같은 형식, duckdb 필요)"""
+        if self.parquet_dir is None or duckdb is None:
+            raise RuntimeError("parquet_dir 설정과 duckdb 설치가 필요합니다: pip install duckdb")
+        if not os.path.isdir(self.parquet_dir):
+            return []
+        
+        since = (date.today() - timedelta(days=days)).isoformat()
+        sql = """
+            SELECT date,
+                   COUNT(*) FILTER (WHERE severity = 'ERROR'),
+                   COUNT(*) FILTER (WHERE severity = 'WARNING'),
+                   COUNT(*) FILTER (WHERE severity = 'INFO')
+            FROM read_parquet(?, hive_partitioning = true, hive_types_autocast = false)
+            WHERE date >= ?
+        """
+        params = [os.path.join(self.parquet_dir, "**", "*.parquet"), since]
+        if repository:
+            # 파티션 컬럼 조건이므로 해당 repository 디렉토리만 읽음
+            sql += " AND repository = ?"
+            params.append(repository)
+        sql += " GROUP BY date ORDER BY date"
+        
+        with duckdb.connect() as con:
+            rows = con.execute(sql, params).fetchall()
+        return [
+            {"date": row[0], "errors": row[1], "warnings": row[2], "infos": row[3]}
+            for row in rows
+        ]
 
 
 class SemgrepResultParser:
     """Semgrep JSON 결과 파싱"""
     
+    # 이보다 큰 결과 파일은 ijson으로 스트리밍 파싱 (전체 문서를 메모리에 올리지 않음)
+    STREAMING_THRESHOLD = 64 * 1024 * 1024
+    
     @staticmethod
-    def parse_semgrep_output(json_path: str) -> tuple[ScanResult, List[FindingDetail]]:
-        """Semgrep JSON 출력 파싱"""
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # 결과 추출
-        results = data.get('results', [])
+    def _stream_results(f, meta: Dict):
+        """results[] 항목을 하나씩 생성하고, 최상위 메타데이터는 meta에 채움"""
+        builder = None
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if prefix == 'results.item' and event == 'end_map':
+                    yield builder.value
+                    builder = None
+            elif prefix == 'results.item' and event == 'start_map':
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+            elif prefix == 'version' and event == 'string':
+                meta['version'] = value
+            elif prefix == 'paths._comment' and event == 'string':
+                meta['repository'] = value
+    
+    @staticmethod
+    def parse_semgrep_output(json_path: str, now: Optional[datetime] = None,
+                             seq: Optional[int] = None) -> tuple[ScanResult, List[FindingDetail]]:
+        """Semgrep JSON 출력 파싱
         
-        # 심각도별 카운트
-        severity_count = Counter(r.get('extra', {}).get('severity', 'INFO') 
-                                for r in results)
+        now: 스캔 시각 (여러 파일을 일괄 처리할 때 배치 시각 하나를 공유, 기본: 현재 시각)
+        seq: 배치 내 순번 - 주면 scan_id 끝에 붙여 같은 초에 파싱한 파일끼리도 겹치지 않게 함
+        """
+        with open(json_path, 'rb') as f:
+            meta = {}
+            if ijson is not None and os.path.getsize(json_path) > SemgrepResultParser.STREAMING_THRESHOLD:
+                results = SemgrepResultParser._stream_results(f, meta)
+            else:
+                # orjson은 스트리밍 load가 없으므로 바이트로 읽어 한 번에 파싱
+                data = orjson.loads(f.read())
+                results = data.get('results', [])
+                meta['version'] = data.get('version')
+                meta['repository'] = data.get('paths', {}).get('_comment')
+            
+            # 심각도 카운트 / 규칙 수 집계 / 취약점 상세 생성을 한 번의 순회로 처리
+            # (스트리밍 시 results는 한 번만 순회 가능)
+            severity_count = [0, 0, 0]
+            sev_idx_get = SEV_IDX.get
+            rule_ids = set()
+            findings = []
+            # 루프 안의 속성 조회를 줄이기 위해 메서드를 지역 변수로 바인딩
+            rule_ids_add = rule_ids.add
+            findings_append = findings.append
+            for result in results:
+                get = result.get
+                extra = get('extra', {})
+                get_extra = extra.get
+                check_id = get('check_id')
+                # 저장/집계 모두 분류된 심각도 사용 (repo_summary와 repo_trend가 항상 일치)
+                sev_idx = sev_idx_get(get_extra('severity'), SEV_DEFAULT_IDX)
+                severity_count[sev_idx] += 1
+                rule_ids_add('' if check_id is None else check_id)
+                findings_append(FindingDetail(
+                    rule_id='unknown' if check_id is None else check_id,
+                    severity=SEVERITIES[sev_idx],
+                    category=get_extra('metadata', {}).get('category', 'unknown'),
+                    file_path=get('path', ''),
+                    line_number=get('start', {}).get('line', 0),
+                    message=get_extra('message', '')
+                ))
         
         # 스캔 정보 생성
+        if now is None:
+            now = datetime.now()
+        scan_id = f"scan_{now.strftime('%Y%m%d_%H%M%S')}"
+        if seq is not None:
+            scan_id = f"{scan_id}_{seq}"
         scan_result = ScanResult(
-            scan_id=f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            repository=data.get('paths', {}).get('_comment', 'unknown'),
-            commit_sha=data.get('version', 'unknown'),
-            timestamp=datetime.now().isoformat(),
-            total_findings=len(results),
-            error_count=severity_count.get('ERROR', 0),
-            warning_count=severity_count.get('WARNING', 0),
-            info_count=severity_count.get('INFO', 0),
+            scan_id=scan_id,
+            repository=meta.get('repository') or 'unknown',
+            commit_sha=meta.get('version') or 'unknown',
+            timestamp=now.isoformat(),
+            total_findings=len(findings),
+            error_count=severity_count[0],
+            warning_count=severity_count[1],
+            info_count=severity_count[2],
             scan_duration=0.0,  # Semgrep 출력에서 추출 필요
-            rules_applied=len(set(r.get('check_id', '') for r in results))
+            rules_applied=len(rule_ids)
         )
         
-        # 취약점 상세 정보 생성
-        findings = []
-        for result in results:
-            finding = FindingDetail(
-                rule_id=result.get('check_id', 'unknown'),
-                severity=result.get('extra', {}).get('severity', 'INFO'),
-                category=result.get('extra', {}).get('metadata', {}).get('category', 'unknown'),
-                file_path=result.get('path', ''),
-                line_number=result.get('start', {}).get('line', 0),
-                message=result.get('extra', {}).get('message', '')
-            )
-            findings.append(finding)
-        
         return scan_result, findings
 
 
@@ -328,9 +676,9 @@ class MonitoringReport:
                 commit_sha="",
                 timestamp=stats['last_scan']['timestamp'],
                 total_findings=stats['last_scan']['findings'],
-                error_count=stats['severity_distribution'].get('ERROR', 0),
-                warning_count=stats['severity_distribution'].get('WARNING', 0),
-                info_count=stats['severity_distribution'].get('INFO', 0),
+                error_count=stats['severity_distribution']['ERROR'],
+                warning_count=stats['severity_distribution']['WARNING'],
+                info_count=stats['severity_distribution']['INFO'],
                 scan_duration=stats['last_scan']['duration'],
                 rules_applied=0
             )
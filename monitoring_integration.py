@@ -1,26 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+
 from monitoring.monitoring_module import (
     MonitoringDatabase,
     SemgrepResultParser,
     MonitoringReport
 )
 
-# 데이터베이스 초기화
-db = MonitoringDatabase()
+# 한 번에 워커로 보낼 파일 수 (작은 파일이 많을 때 프로세스 간 통신 횟수 감소)
+PARSE_CHUNKSIZE = 4
 
-# 저장된 JSON 파일 처리
-import os
-for filename in os.listdir("semgrep_results"):
-    if filename.endswith(".json"):
-        filepath = os.path.join("semgrep_results", filename)
-        
-        # 파싱
-        scan_result, findings = SemgrepResultParser.parse_semgrep_output(filepath)
-        
-        # 저장
-        db.save_scan_result(scan_result, findings)
-        print(f"✅ Processed: {filename}")
-
-# 리포트 생성
-reporter = MonitoringReport(db)
-report = reporter.generate_summary_report("your-repo-name")
-print(f"보안 점수: {report['security_score']}")
+
+def main():
+    # 데이터베이스 초기화
+    db = MonitoringDatabase()
+
+    # 새로 수집할 JSON 파일 선별 (이전 실행에서 이미 수집한 파일은 건너뜀)
+    pending = []
+    with os.scandir("semgrep_results") as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.is_file():
+                path = os.path.abspath(entry.path)
+                st = entry.stat()
+                if db.already_processed(path, st.st_mtime, st.st_size):
+                    print(f"⏭️  Skipped (already processed): {entry.name}")
+                    continue
+                pending.append((entry.name, path, st.st_mtime, st.st_size))
+
+    # 배치 전체가 시각 하나를 공유하고, 순번으로 scan_id를 구분
+    batch_now = datetime.now()
+    paths = [p[1] for p in pending]
+    
+    # 파싱은 워커 프로세스에서 병렬로, DB 저장은 메인 프로세스 하나에서만 (SQLite 쓰기 경합 방지)
+    if len(pending) > 1:
+        with ProcessPoolExecutor() as ex:
+            parsed = list(ex.map(SemgrepResultParser.parse_semgrep_output,
+                                 paths, repeat(batch_now), range(len(paths)),
+                                 chunksize=PARSE_CHUNKSIZE))
+    else:
+        parsed = [SemgrepResultParser.parse_semgrep_output(path, now=batch_now, seq=i)
+                  for i, path in enumerate(paths)]
+
+    for (name, path, mtime, size), (scan_result, findings) in zip(pending, parsed):
+        # 저장 대기
+        db.stage(scan_result, findings, source=(path, mtime, size))
+        print(f"✅ Processed: {name}")
+
+    # 일괄 저장
+    saved = db.flush_all()
+    print(f"💾 Saved {saved} scan results")
+
+    # 리포트 생성
+    reporter = MonitoringReport(db)
+    report = reporter.generate_summary_report("your-repo-name")
+    print(f"보안 점수: {report['security_score']}")
+
+
+if __name__ == "__main__":
+    main()
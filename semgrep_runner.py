@@ -1,11 +1,18 @@
 import subprocess
-import json
+import logging
+import orjson
 import os
 from datetime import datetime
+from monitoring.monitoring_module import SEV_DEFAULT_IDX, SEV_IDX
 
-def run_semgrep(target_dir, config_file="monitoring/semgrep_rules.yaml", output_dir="./semgrep_results"):
+logger = logging.getLogger(__name__)
+
+# 실패 시 에러 메시지에 담을 stderr 끝부분 길이
+STDERR_TAIL_CHARS = 2000
+
+def run_semgrep(target_dir, config_file="monitoring/semgrep_rules.yaml", output_dir=None, jobs=None):
     """
-    Semgrep을 실행하고 결과를 JSON 파일로 저장
+    Semgrep을 실행하고 결과 요약 반환 (output_dir를 주면 JSON 파일로도 보관)
     
     cmd = [
         "semgrep",
@@ -16,64 +23,75 @@ def run_semgrep(target_dir, config_file="monitoring/semgrep_rules.yaml", output_
         code_dir
     ]
     Args:
-        target_dir: 스캔할 디렉토리
+        target_dir: 스캔할 디렉토리 (또는 디렉토리 목록 - 한 번의 실행으로 함께 스캔해 규칙 로딩/엔진 초기화를 1회로)
         config_file: Semgrep 규칙 파일 경로 (기본: monitoring/semgrep_rules.yaml)
-        output_dir: 결과 저장 디렉토리
+        output_dir: 결과 보관 디렉토리 (None이면 파일로 저장하지 않음)
+        jobs: Semgrep 병렬 작업 수 (-j, 기본: CPU 코어 수)
     
     Returns:
         dict: 스캔 결과 요약
     """
-    # 결과 디렉토리 생성
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 타임스탬프로 파일명 생성
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_file = os.path.join(output_dir, f"scan_{timestamp}.json")
+    targets = [target_dir] if isinstance(target_dir, (str, os.PathLike)) else list(target_dir)
     
     # Semgrep 규칙 파일이 없으면 기본 규칙 사용
     if not os.path.exists(config_file):
-        print(f"⚠️  Custom rules not found at {config_file}, using default rules")
+        logger.warning("⚠️  Custom rules not found at %s, using default rules", config_file)
         config_arg = "--config=auto"
     else:
         config_arg = f"--config={config_file}"
     
     try:
         # Semgrep 실행
-        print(f"🔍 Running Semgrep on {target_dir}...")
+        logger.info("🔍 Running Semgrep on %s...", ", ".join(map(str, targets)))
         
+        # 결과는 파일을 거치지 않고 stdout으로 받아 바로 파싱
         result = subprocess.run(
             [
                 "semgrep",
                 config_arg,
                 "--json",
-                "--output", output_file,
-                target_dir
+                "-j", str(jobs or os.cpu_count() or 1),
+                *targets
             ],
             capture_output=True,
-            text=True,
             check=False  # Semgrep은 취약점 발견 시 exit code 1을 반환할 수 있음
         )
         
-        print(f"✅ Semgrep scan completed")
-        print(f"📄 Results saved to: {output_file}")
+        # 0 = 취약점 없음, 1 = 취약점 발견, 그 외(설정 오류/크래시/OOM 등)는 실패
+        # 결과 파일이 없으므로 stderr가 유일한 진단 정보
+        if result.returncode not in (0, 1) or not result.stdout.strip():
+            stderr_tail = result.stderr.decode(errors='replace').strip()[-STDERR_TAIL_CHARS:]
+            message = f"Semgrep exited with code {result.returncode}: {stderr_tail or '(no stderr)'}"
+            logger.error("❌ %s", message)
+            return {
+                "status": "error",
+                "message": message
+            }
+        
+        logger.info("✅ Semgrep scan completed")
+        scan_data = orjson.loads(result.stdout)
         
-        # 결과 파일 읽기
-        with open(output_file, 'r', encoding='utf-8') as f:
-            scan_data = json.load(f)
+        # 요청한 경우에만 원본 JSON 보관 (받은 바이트를 그대로 기록)
+        output_file = None
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            # 타임스탬프로 파일명 생성
+            # (동시 스캔이 같은 초에 끝나도 겹치지 않도록 마이크로초까지 포함)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            output_file = os.path.join(output_dir, f"scan_{timestamp}.json")
+            with open(output_file, 'wb') as f:
+                f.write(result.stdout)
+            logger.info("📄 Results saved to: %s", output_file)
         
         # 결과 요약 생성
         results = scan_data.get('results', [])
         
-        # 심각도별 카운트
-        severity_count = {
-            'ERROR': 0,
-            'WARNING': 0,
-            'INFO': 0
-        }
-        
+        # 심각도별 카운트 (딕셔너리 갱신 대신 정수 배열에 누적)
+        counts = [0, 0, 0]
+        sev_idx_get = SEV_IDX.get
         for finding in results:
-            severity = finding.get('extra', {}).get('severity', 'INFO')
-            severity_count[severity] = severity_count.get(severity, 0) + 1
+            counts[sev_idx_get(finding.get('extra', {}).get('severity'), SEV_DEFAULT_IDX)] += 1
+        severity_count = {'ERROR': counts[0], 'WARNING': counts[1], 'INFO': counts[2]}
         
         summary = {
             "status": "completed",
@@ -85,24 +103,25 @@ def run_semgrep(target_dir, config_file="monitoring/semgrep_rules.yaml", output_
             "infos": severity_count['INFO']
         }
         
-        print(f"📊 Found {len(results)} issues:")
-        print(f"   - ERROR: {severity_count['ERROR']}")
-        print(f"   - WARNING: {severity_count['WARNING']}")
-        print(f"   - INFO: {severity_count['INFO']}")
+        logger.info(
+            "📊 Found %d issues (ERROR: %d, WARNING: %d, INFO: %d)",
+            len(results), severity_count['ERROR'], severity_count['WARNING'], severity_count['INFO']
+        )
         
         return summary
         
     except FileNotFoundError:
-        print("❌ Semgrep not found. Please install it:")
-        print("   pip install semgrep")
-        print("   or visit: https://semgrep.dev/docs/getting-started/")
+        logger.error(
+            "❌ Semgrep not found. Please install it: pip install semgrep "
+            "(or visit: https://semgrep.dev/docs/getting-started/)"
+        )
         return {
             "status": "error",
             "message": "Semgrep not installed"
         }
     
     except Exception as e:
-        print(f"❌ Error running Semgrep: {e}")
+        logger.error("❌ Error running Semgrep: %s", e)
         return {
             "status": "error",
             "message": str(e)
@@ -112,4 +131,4 @@ def run_semgrep(target_dir, config_file="monitoring/semgrep_rules.yaml", output_
 # 기존 코드와의 호환성을 위한 래퍼 함수
 def run_semgrep_legacy(target_dir):
     """기존 코드 호환을 위한 함수"""
-    return run_semgrep(target_dir)
+    return run_semgrep(target_dir, output_dir="./semgrep_results")